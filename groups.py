@@ -24,32 +24,228 @@ import matplotlib.pyplot as plt
 from math import factorial as fact
 # from math import log as ln_
 from math import pi
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tempfile import NamedTemporaryFile
+import os
+
+
+class Algebra:
+    """basis elements and multiplication rules
+
+    rules are collected by add_mul_rule(), finalize() checks them and freezes the structure constants:
+    structure[i, j, k] = coeff of basis[k] in basis[i] * basis[j]
+    """
+
+    def __init__(self, unit='1'):
+        self.unit = unit
+        self.basis = [unit]     # ordered elements, position in the list is the index in the tensor
+        self.index = {unit: 0}
+        self.mul_table = {unit + ' ' + unit: 1}     # rules by name (dict backend)
+        self.structure = np.ones((1, 1, 1))
+        self.defined = np.ones((1, 1), dtype=bool)     # products with a rule
+        self.left = None    # cache of left_structure()
+        self.right = None   # cache of right_structure()
+        self.power_assoc = None     # cache of is_power_associative()
+        self.finalized = False
+
+    def __len__(self):
+        return len(self.basis)
+
+    def __repr__(self):
+        return f'Algebra({self.basis})'
+
+    def __deepcopy__(self, memo):
+        return self     # values are bound to the algebra, copies share it
+
+    @staticmethod
+    def from_rules(rules: dict, unit='1'):
+        """algebra from {'A B': result}, result is a number or a dict of coefficients, e.g.
+        Algebra.from_rules({'A A': {'1': 1, 'A': 1}}) for A^2 = A + 1"""
+        algebra = Algebra(unit)
+        for key in rules:
+            for name in key.split() + list(rules[key] if type(rules[key]) == dict else []):
+                algebra.add_element(name)
+        for key, result in rules.items():
+            if type(result) == dict:
+                result = Group(result, algebra)
+            algebra.add_mul_rule(*key.split(), result)
+        return algebra
+
+    def item(self, name: str, value=1.):
+        """single-item value of this algebra"""
+        return item(name, value, algebra=self)
+
+    def add_element(self, name: str) -> int:
+        """append name to the basis (with 1 * name = name * 1 = name), return its index"""
+        if name in self.index:
+            return self.index[name]
+        if self.finalized:
+            raise ValueError(f'unknown element {name}: the algebra is finalized')
+
+        k = len(self.basis)
+        self.basis.append(name)
+        self.index[name] = k
+        self.structure = np.pad(self.structure, [(0, 1)] * 3)
+        self.defined = np.pad(self.defined, [(0, 1)] * 2)
+        self.structure[0, k, k] = self.structure[k, 0, k] = 1
+        self.defined[0, k] = self.defined[k, 0] = True
+
+        one = Group({name: 1}, self)
+        self.mul_table.update({self.unit + ' ' + name: one, name + ' ' + self.unit: one})
+        self.left = self.right = self.power_assoc = None
+        return k
+
+    def add_mul_rule(self, item1: str, item2: str, result):
+        """add multiplication rule (by default items commute)"""
+        if self.finalized:
+            raise ValueError(f'cannot add {item1} * {item2}: the algebra is finalized')
+
+        new = item1 + ' ' + item2
+        self.mul_table.update({new: result})
+        # try to add commuted to mul_table
+        commuted = item2 + ' ' + item1
+        commute = commuted not in self.mul_table
+        if commute:
+            self.mul_table.update({commuted: result})
+
+        # same rule in the structure tensor
+        i, j = self.add_element(item1), self.add_element(item2)
+        if type(result) != Group:
+            result = item(name=self.unit, value=result, algebra=self)
+        if result.algebra is not self:
+            raise ValueError(f'{result} belongs to a different algebra')
+        v = result.vector()
+        self.structure[i, j] = v
+        self.defined[i, j] = True
+        if commute:
+            self.structure[j, i] = v
+            self.defined[j, i] = True
+        self.left = self.right = self.power_assoc = None
+
+    def finalize(self, check_associativity=False, tol=1e-12):
+        """check that every product has a rule (and optionally associativity), then freeze the algebra"""
+        missing = [self.basis[i] + ' ' + self.basis[j] for i, j in np.argwhere(~self.defined)]
+        if missing:
+            raise ValueError('Missing products: ' + ', '.join(missing))
+
+        if check_associativity:
+            c = self.structure
+            left = np.einsum('ijm,mkn->ijkn', c, c)     # (ij)k
+            right = np.einsum('jkm,imn->ijkn', c, c)    # i(jk)
+            bad = np.argwhere(np.abs(left - right) > tol)
+            if len(bad):
+                i, j, k = [self.basis[n] for n in bad[0][:3]]
+                raise ValueError(f'not associative: ({i} {j}) {k} != {i} ({j} {k})')
+
+        self.left_structure()
+        self.finalized = True
+        return self
+
+    def is_power_associative(self, tol=1e-9, trials=3):
+        """x^2 x = x x^2 and x^2 x^2 = (x^2 x) x at random x (enough in characteristic 0, Albert), cached;
+        power_by_squaring relies on it"""
+        if self.power_assoc is None:
+            c = self.structure
+
+            def mul(a, b):
+                return np.einsum('i,j,ijk->k', a, b, c)
+
+            self.power_assoc = True
+            for x in np.random.default_rng(0).normal(size=(trials, len(self))):
+                x2 = mul(x, x)
+                for u, v in ((mul(x2, x), mul(x, x2)), (mul(x2, x2), mul(mul(x2, x), x))):
+                    if np.abs(u - v).max() > tol * max(1., np.abs(u).max()):
+                        self.power_assoc = False
+        return self.power_assoc
+
+    def left_structure(self):
+        """structure tensor as a (d, d * d) matrix, so that coeffs @ left_structure() are the
+        flattened left-multiplication matrices (cached until the next rule / element)"""
+        if self.left is None:
+            d = len(self)
+            self.left = np.ascontiguousarray(self.structure.transpose(0, 2, 1)).reshape(d, d * d)
+        return self.left
+
+    def left_matrices(self, coeffs):
+        """left-regular representation of (..., d) coefficients: out[..., k, j] = coeff of basis[k] in x * basis[j]"""
+        coeffs = np.asarray(coeffs)
+        d = len(self)
+        return (coeffs @ self.left_structure()).reshape(coeffs.shape[:-1] + (d, d))
+
+    def right_structure(self):
+        """like left_structure(), for the right-multiplication matrices"""
+        if self.right is None:
+            d = len(self)
+            self.right = np.ascontiguousarray(self.structure.transpose(1, 2, 0)).reshape(d, d * d)
+        return self.right
+
+    def right_matrices(self, coeffs):
+        """right-regular representation of (..., d) coefficients: out[..., k, j] = coeff of basis[k] in basis[j] * x"""
+        coeffs = np.asarray(coeffs)
+        d = len(self)
+        return (coeffs @ self.right_structure()).reshape(coeffs.shape[:-1] + (d, d))
+
+    def inverse(self, coeffs, tol=1e-12, side='left'):
+        """batched 1 / x for (..., d) coefficients, NaN where x is not invertible
+
+        side='left' solves every y * x = 1 (the convention of 1 / x and a / b = a * (1 / b)),
+        side='right' every x * y = 1 (they differ in non-associative algebras),
+        with a single np.linalg.solve on the stacked (N, d, d) matrices
+        """
+        coeffs = np.asarray(coeffs, dtype=float)
+        d = len(self)
+        if side == 'left':
+            m = self.right_matrices(coeffs).reshape(-1, d, d)
+        elif side == 'right':
+            m = self.left_matrices(coeffs).reshape(-1, d, d)
+        else:
+            raise ValueError(f"side must be 'left' or 'right', not {side!r}")
+
+        # singular if |det| is negligible compared to the product of the column norms (Hadamard bound)
+        scale = np.prod(np.linalg.norm(m, axis=-2), axis=-1)
+        singular = ~(np.abs(np.linalg.det(m)) > tol * scale)
+        m[singular] = np.eye(d)
+
+        u = np.zeros((len(m), d, 1))
+        u[:, self.index[self.unit]] = 1
+        out = np.linalg.solve(m, u)[..., 0]
+        out[singular] = np.nan
+        return out.reshape(coeffs.shape)
 
 
 class Group:
+    """value of an algebra, stored as the array of its coefficients (ordered like algebra.basis)"""
+
+    __slots__ = ('algebra', 'vec', 'index_')
 
     Unit = '1'
-    elements = set(Unit)    # record of all elements
-    mul_table = {Unit + ' ' + Unit: 1}
+    default_algebra = Algebra(Unit)
 
-    def __init__(self, items: dict):
-        self.items = items  # deepcopy?
+    def __init__(self, items: dict, algebra=None):
+        self.algebra = Group.default_algebra if algebra is None else algebra
         self.index_ = 0
-        self.update()
-        self.clean()
+        # record new elements & add mul rules (A * 1 = A, 1 * A = A)
+        for i in items:
+            self.algebra.add_element(i)
+        self.vec = np.zeros(len(self.algebra))
+        for i in items:
+            self.vec[self.algebra.index[i]] += items[i]
 
     def __call__(self, name=None):
         if name is None:
-            return self.items
+            # {element: value} of the non-null elements
+            basis = self.algebra.basis
+            return {basis[i]: x for i, x in enumerate(self.vec.tolist()) if x != 0}
         else:
             # return value of "name"
             return self()[name] if name in self() else 0
 
     def __repr__(self):
         """ultra-fancy print"""
-        if len(self):
-            s = ['+' if self.items[i] >= 0 else '-' for i in self.items]
-            v = [self.items[i] for i in self.items]
+        items = self()
+        if len(items):
+            s = ['+' if items[i] >= 0 else '-' for i in items]
+            v = [items[i] for i in items]
             n = [str(round(abs(i), 15)) for i in v]
             n = [str(round(float(i))) if round(float(i)) == float(i) else i for i in n]
             n = [i + ' ' for i in n]
@@ -57,7 +253,7 @@ class Group:
                 f = float(n[i])
                 if f == 1:
                     n[i] = ''
-            e = [i for i in self.items]
+            e = [i for i in items]
             e = ['' if e[i] == '1' and abs(v[i]) != 1 else e[i] for i in range(len(e))]
             out = [s[i] + ' ' + n[i] + e[i] for i in range(len(n))]
             return ' '.join(out)
@@ -65,7 +261,7 @@ class Group:
             return '0'
 
     def __len__(self):
-        return len(self())
+        return int(np.count_nonzero(self.vec))
 
     def __iter__(self):
         self.index_ = 0
@@ -76,29 +272,36 @@ class Group:
             name = self.keys()[self.index_]
             value = self()[name]
             self.index_ += 1
-            return item(name=name, value=value)
+            return item(name=name, value=value, algebra=self.algebra)
         else:
             raise StopIteration
 
-    def update(self):
-        """record new elements & add mul rules (A * 1 = A, 1 * A = A)"""
-        for i in self.items:
-            if i not in Group.elements:
-                Group.elements.update(i)
-                add_mul_rule(Group.Unit, i, Group({i: 1}))
-
-    def clean(self):
-        """remove null elements"""
-        new = {}
-        items = self()
-        for i in items:
-            if items[i] != 0:
-                new.update({i: items[i]})
-        self.items = new
-
     def keys(self):
         return list(self().keys())
 
+    def vector(self):
+        """coefficients as an array ordered like the basis of self.algebra"""
+        d = len(self.algebra)
+        if len(self.vec) < d:
+            # elements were added to the algebra after self was created
+            self.vec = np.pad(self.vec, (0, d - len(self.vec)))
+        return self.vec
+
+    @staticmethod
+    def from_vector(v, algebra=None):
+        """inverse of vector(): cheap constructor, elements are already known so nothing is registered
+        (v is not copied)"""
+        out = object.__new__(Group)
+        out.algebra = Group.default_algebra if algebra is None else algebra
+        out.vec = np.asarray(v, dtype=float)
+        out.index_ = 0
+        return out
+
+    def check_algebra(self, other):
+        """values of different algebras can't be mixed"""
+        if other.algebra is not self.algebra:
+            raise ValueError(f'{self} and {other} belong to different algebras')
+
     def values(self):
         return [self()[i] for i in self()]
 
@@ -113,33 +316,24 @@ class Group:
             return self.keys()[0]
 
     def __abs__(self):
-        y = 0
-        for i in self():
-            y += self()[i] ** 2
-        return y ** (1 / 2)
+        return float(np.sqrt(np.dot(self.vec, self.vec)))
 
-    def __add__(self, other):   # todo simplify
+    def __add__(self, other):
         if type(other) == Group:
-            # join self.items + other.items
-            items = deepcopy(self())
-            for i in other():
-                if i in items:
-                    items.update({i: other()[i] + self()[i]})
-                else:
-                    items.update({i: other()[i]})
-            self.clean()
-            return Group(items)
+            self.check_algebra(other)
+            return Group.from_vector(self.vector() + other.vector(), self.algebra)
         elif type(other) == int or type(other) == float:
-            return self + item(name=Group.Unit, value=other)
+            return self + item(name=self.algebra.unit, value=other, algebra=self.algebra)
+        elif type(other) == GroupArray:
+            return NotImplemented
         else:
-            return self + item(name=other.__name__, value=other)    # todo ?
+            return self + item(name=other.__name__, value=other, algebra=self.algebra)    # todo ?
 
     def __radd__(self, other):
         return self + other
 
     def __neg__(self):
-        items = self()
-        return Group({i: -items[i] for i in items})
+        return Group.from_vector(-self.vec, self.algebra)
 
     def __rsub__(self, other):
         return -self + other
@@ -148,14 +342,20 @@ class Group:
         return self + (-other)
 
     def __mul__(self, other):
-        if type(other) == Group:
-            out = Group({})
+        if type(other) == Group and self.algebra.finalized:
+            self.check_algebra(other)
+            # one contraction with the structure constants
+            return Group.from_vector(self.algebra.left_matrices(self.vector()) @ other.vector(), self.algebra)
+
+        elif type(other) == Group:
+            self.check_algebra(other)
+            out = Group({}, self.algebra)
 
             for i in self:
                 for j in deepcopy(other):
                     mul_tag = i.name() + ' ' + j.name()     # find def in mul_table
                     try:
-                        result = Group.mul_table[mul_tag]   # find result   deepcopy?
+                        result = self.algebra.mul_table[mul_tag]   # find result   deepcopy?
                     except KeyError:
                         print('Missing product: ', mul_tag)    # todo
                     else:
@@ -163,8 +363,9 @@ class Group:
             return out
 
         elif type(other) == int or type(other) == float:
-            items = self()
-            return Group({i: items[i] * other for i in items})
+            return Group.from_vector(self.vec * other, self.algebra)
+
+        return NotImplemented   # let GroupArray handle it
 
     def __rmul__(self, other):
         return self * other
@@ -172,64 +373,310 @@ class Group:
     def __truediv__(self, other):   # todo check
         return self * (1 / other)
 
-    def __rtruediv__(self, other):  # todo check Group.elements changes order
+    def __rtruediv__(self, other):
         if other == 1:
-            # 1 / Group
-
-            x = [item(i) for i in Group.elements]
-            d = self
-
-            v = [i * d for i in x]
-
-            m = [[j(i) for j in v] for i in Group.elements]
-            u = [1 if i == Group.Unit else 0 for i in Group.elements]
-
-            m = np.array(m)     # todo check
-            u = np.array(u).T
-
-            try:
-                sol = np.linalg.solve(m, u)
-            except np.linalg.LinAlgError:
-                return None     # Singular matrix
-            else:
-                return sum([sol[i] * x[i] for i in range(len(sol))])
+            # 1 / Group, None if self is not invertible
+            sol = self.algebra.inverse(self.vector())
+            if np.isnan(sol).any():
+                return None
+            return Group.from_vector(sol, self.algebra)
 
         else:
             return other * (1 / self)
 
     def __eq__(self, other):    # todo
         if type(other) == Group:
-            return self() == other()
+            return self.algebra is other.algebra and np.array_equal(self.vector(), other.vector())
         else:
             return False
 
-    def __pow__(self, power, modulo=None):    # todo check
-        if power >= 0:
-            out = 1
-            for i in range(power):
-                out *= self
-            return out
-        else:
-            out = 1
-            for i in range(-power):
-                out /= self
-            return out
+    def __pow__(self, power, modulo=None):
+        if power < 0:
+            x = 1 / self    # single inverse
+            return None if x is None else x ** -power
+        return power_by_squaring(self, power)
+
+    def polyval(self, coeffs):
+        """polynomial in self, coeffs from the highest power (like np.polyval)"""
+        return polyval(self, coeffs)
+
+    def series(self, name, order=20):
+        """truncated Taylor series of name (see SERIES) up to self ** order"""
+        return series(self, name, order)
+
+
+def add_mul_rule(item1: str, item2: str, result, algebra=None):
+    """add multiplication rule (by default items commute) to algebra (default: Group.default_algebra)"""
+    (Group.default_algebra if algebra is None else algebra).add_mul_rule(item1, item2, result)
 
 
-def add_mul_rule(item1: str, item2: str, result):
-    """add multiplication rule (by default items commute)"""
-    new = item1 + ' ' + item2
-    Group.mul_table.update({new: result})
-    # try to add commuted to mul_table
-    commuted = item2 + ' ' + item1
-    if commuted not in Group.mul_table:
-        Group.mul_table.update({commuted: result})
+def compile_algebra(b=True, check_associativity=False, algebra=None):
+    """finalize algebra (default: Group.default_algebra), products are then computed with its structure tensor
+    instead of mul_table (b=False goes back to the dict backend and allows new rules)"""
+    algebra = Group.default_algebra if algebra is None else algebra
+    if b:
+        algebra.finalize(check_associativity=check_associativity)
+    else:
+        algebra.finalized = False
 
 
-def item(name: str, value=1.) -> Group:
-    """creates a group with a single item"""
+def item(name: str, value=1., algebra=None) -> Group:
+    """creates a group with a single item (in algebra, default: Group.default_algebra)"""
     name_ = name.replace(' ', '')
-    return Group({name_: value})
+    return Group({name_: value}, algebra)
+
+
+class GroupArray:
+    """array of Group values, stored as a (..., dim) array of coefficients ordered like the basis of algebra"""
+
+    def __init__(self, coeffs, algebra=None):
+        self.coeffs = np.asarray(coeffs, dtype=float)
+        self.algebra = Group.default_algebra if algebra is None else algebra
+
+    @staticmethod
+    def plane(x, y, name='A', algebra=None):
+        """grid of y + name * x values, indexed as [x, y] (like test_4)"""
+        algebra = Group.default_algebra if algebra is None else algebra
+        coeffs = np.zeros((len(x), len(y), len(algebra)))
+        coeffs[..., algebra.index[algebra.unit]] = np.asarray(y)[None, :]
+        coeffs[..., algebra.index[name]] = np.asarray(x)[:, None]
+        return GroupArray(coeffs, algebra)
+
+    def new(self, coeffs):
+        """GroupArray of coeffs in the same algebra"""
+        return GroupArray(coeffs, self.algebra)
+
+    @property
+    def shape(self):
+        return self.coeffs.shape[:-1]
+
+    def __len__(self):
+        return len(self.coeffs)
+
+    def __call__(self, name):
+        """array of the coefficients of name"""
+        return self.padded()[..., self.algebra.index[name]]
+
+    def __getitem__(self, index):
+        out = self.padded()[index]
+        if out.ndim == 1:
+            return None if np.isnan(out).any() else Group.from_vector(out, self.algebra)
+        return self.new(out)
+
+    def __repr__(self):
+        return f'GroupArray(shape={self.shape}, basis={self.algebra.basis})'
+
+    def padded(self):
+        """coefficients padded with zeros to the current size of the basis"""
+        d = len(self.algebra)
+        if self.coeffs.shape[-1] < d:
+            pad = [(0, 0)] * (self.coeffs.ndim - 1) + [(0, d - self.coeffs.shape[-1])]
+            return np.pad(self.coeffs, pad)
+        return self.coeffs
+
+    def coeffs_of(self, other):
+        """coefficients of other (GroupArray, Group or number), broadcastable against self"""
+        if type(other) != GroupArray and type(other) != Group:
+            other = item(name=self.algebra.unit, value=other, algebra=self.algebra)
+        if other.algebra is not self.algebra:
+            raise ValueError(f'{self} and {other} belong to different algebras')
+        return other.padded() if type(other) == GroupArray else other.vector()
+
+    def __abs__(self):
+        return np.sqrt((self.coeffs ** 2).sum(axis=-1))
+
+    def __add__(self, other):
+        return self.new(self.padded() + self.coeffs_of(other))
+
+    def __radd__(self, other):
+        return self + other
+
+    def __neg__(self):
+        return self.new(-self.coeffs)
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return -self + other
+
+    def __mul__(self, other):
+        if type(other) in [int, float] or isinstance(other, np.ndarray):
+            return self.new(self.coeffs * other)
+        # left-multiplication matrices, then one batched matrix-vector product
+        m = self.algebra.left_matrices(self.padded())
+        return self.new(np.einsum('...kj,...j->...k', m, self.coeffs_of(other)))
+
+    def __rmul__(self, other):
+        if type(other) in [int, float] or isinstance(other, np.ndarray):
+            return self * other
+        m = self.algebra.left_matrices(self.coeffs_of(other))
+        return self.new(np.einsum('...kj,...j->...k', m, self.padded()))
+
+    def inverse(self, side='left'):
+        """1 / self (y * self = 1, see Algebra.inverse), NaN where self is not invertible"""
+        return self.new(self.algebra.inverse(self.padded(), side=side))
+
+    def __truediv__(self, other):
+        if type(other) in [int, float] or isinstance(other, np.ndarray):
+            return self * (1 / other)
+        if type(other) != GroupArray:
+            other = self.new(self.coeffs_of(other))
+        return self * other.inverse()
+
+    def __rtruediv__(self, other):
+        return other * self.inverse()
+
+    def __pow__(self, power, modulo=None):
+        if power < 0:
+            return self.inverse() ** -power     # single inverse
+        if power == 0:
+            return 1 + 0 * self
+        return power_by_squaring(self, power)
+
+    def polyval(self, coeffs):
+        """polynomial in self, coeffs from the highest power (like np.polyval)"""
+        out = polyval(self, coeffs)
+        return out if type(out) == GroupArray else out + 0 * self
+
+    def series(self, name, order=20):
+        """truncated Taylor series of name (see SERIES) up to self ** order"""
+        return series(self, name, order)
+
+    # --- Power series ----------------------------------------------------------------
+
+    def exp(self, pre=20):
+        term = 1 + 0 * self
+        out = term
+        for i in range(1, pre):
+            term = term * self / i
+            out = out + term
+        return out
+
+    def sin(self, pre=10):
+        x2 = self * self
+        term = self
+        out = term
+        for i in range(1, pre):
+            term = -term * x2 / ((2 * i) * (2 * i + 1))
+            out = out + term
+        return out
+
+    def cos(self, pre=10):
+        x2 = self * self
+        term = 1 + 0 * self
+        out = term
+        for i in range(1, pre):
+            term = -term * x2 / ((2 * i - 1) * (2 * i))
+            out = out + term
+        return out
+
+    def ln(self, pre=10):
+        """series around 1, NaN where abs(x - 1) > 1"""
+        y = self - 1
+        term = y
+        out = term
+        for i in range(1, pre):
+            term = -term * y
+            out = out + term / (i + 1)
+        out.coeffs[abs(y) > 1] = np.nan
+        return out
+
+
+# Taylor coefficients: name -> (center, coefficient of (x - center) ** i)
+SERIES = {'exp': (0, lambda i: 1 / fact(i)),
+          'sin': (0, lambda i: (-1) ** (i // 2) / fact(i) if i % 2 else 0),
+          'cos': (0, lambda i: 0 if i % 2 else (-1) ** (i // 2) / fact(i)),
+          'ln': (1, lambda i: (-1) ** (i + 1) / i if i else 0)}
+
+
+def power_by_squaring(x, power: int):
+    """x ** power for power >= 0 with O(log(power)) products (works for Group and GroupArray);
+    left to right ((x x) x) ... in algebras that are not power-associative (the result depends on the order)"""
+    out = 1
+    if not x.algebra.is_power_associative():
+        for _ in range(power):
+            out = out * x
+        return out
+    while power:
+        if power & 1:
+            out = x * out
+        power >>= 1
+        if power:
+            x = x * x
+    return out
+
+
+def polyval(x, coeffs):
+    """Horner scheme, coeffs from the highest power: one product per coefficient"""
+    out = coeffs[0]
+    for c in coeffs[1:]:
+        out = x * out + c
+    return out
+
+
+def series(x, name, order=20):
+    """truncated Taylor series of SERIES[name] up to the power order"""
+    center, coeff = SERIES[name]
+    return polyval(x - center if center else x, [coeff(i) for i in range(order, -1, -1)])
+
+
+# functions for render(), by name
+PLOT_FUNCTIONS = {'z^-1': GroupArray.inverse,
+                  'sin': GroupArray.sin,
+                  'cos': GroupArray.cos,
+                  'exp': GroupArray.exp}
+
+
+def render_tile(algebra, f, path, shape, window, rows, cols, name='A'):
+    """write |f(y + name x)| for image[rows, cols] into the memmap at path (see render)"""
+    x = np.linspace(window[0], window[1], shape[0])[rows[0]:rows[1]]
+    y = np.linspace(window[2], window[3], shape[1])[cols[0]:cols[1]]
+    v = abs(PLOT_FUNCTIONS.get(f, f)(GroupArray.plane(x, y, name=name, algebra=algebra)))
+    v[np.isnan(v)] = 0     # not invertible
+
+    image = np.memmap(path, dtype=np.float32, mode='r+', shape=shape)
+    image[rows[0]:rows[1], cols[0]:cols[1]] = v
+    image.flush()
+
+
+def render(algebra, f='z^-1', window=(-2, 2, -2, 2), resolution=512, tile=256, path=None, workers=None, name='A'):
+    """
+    |f(y + name x)| for x, y in window = (x_min, x_max, y_min, y_max), computed tile by tile in a process pool
+    :param algebra: Algebra, or rules for Algebra.from_rules()
+    :param f: key of PLOT_FUNCTIONS or a (picklable) function of GroupArray
+    :param resolution: n or (n_x, n_y)
+    :param tile: side of the tiles
+    :param path: file of the output memmap, owned by the caller (None: a temporary file, removed once the image is
+    copied in memory)
+    :param workers: max_workers of the ProcessPoolExecutor
+    :return: float32 memmap (array if path is None) indexed as [x, y] (like test_4)
+    """
+    if type(algebra) == dict:
+        algebra = Algebra.from_rules(algebra)
+    if not algebra.finalized:
+        algebra.finalize()
+    shape = (resolution, resolution) if type(resolution) == int else tuple(resolution)
+    temporary = path is None
+    if temporary:
+        with NamedTemporaryFile(suffix='.dat', delete=False) as file:
+            path = file.name
+
+    try:
+        memmap = np.memmap(path, dtype=np.float32, mode='w+', shape=shape)
+        tiles = [((i, min(i + tile, shape[0])), (j, min(j + tile, shape[1])))
+                 for i in range(0, shape[0], tile) for j in range(0, shape[1], tile)]
+
+        with ProcessPoolExecutor(workers) as pool:
+            jobs = [pool.submit(render_tile, algebra, f, path, shape, window, rows, cols, name) for rows, cols in tiles]
+            for job in as_completed(jobs):
+                job.result()    # raise errors of the workers
+        image = np.array(memmap) if temporary else memmap
+    finally:
+        if temporary:
+            memmap = None   # close the file before removing it
+            os.remove(path)
+    return image
 
 
 def test_1():
@@ -326,6 +773,165 @@ def test_4():
     plt.show()
 
 
+def test_5():
+    """octonions: compiled products must match the dict backend"""
+    names = ['e%d' % i for i in range(1, 8)]
+    e = [item(i) for i in names]
+    for i in names:
+        add_mul_rule(i, i, -1)
+    for a, b, c in [(1, 2, 4), (2, 3, 5), (3, 4, 6), (4, 5, 7), (5, 6, 1), (6, 7, 2), (7, 1, 3)]:
+        for x, y, z in [(a, b, c), (b, c, a), (c, a, b)]:
+            add_mul_rule(names[x-1], names[y-1], e[z-1])
+            add_mul_rule(names[y-1], names[x-1], -e[z-1])
+
+    x = 1 + sum([(i + 1) * e[i] for i in range(7)])
+    y = 2 - sum([(i % 3) * e[i] for i in range(7)])
+
+    timer = Timer()
+    for _ in range(100):
+        z1 = x * y
+    timer('dict')
+    compile_algebra(True)
+    for _ in range(100):
+        z2 = x * y
+    timer('compiled')
+    compile_algebra(False)
+
+    try:
+        compile_algebra(True, check_associativity=True)
+    except ValueError:
+        pass    # octonions are not associative
+    else:
+        assert False
+
+    assert set(z1.keys()) == set(z2.keys())
+    assert all([abs(z1(i) - z2(i)) < 1e-12 for i in z1()])
+
+
+def test_6():
+    """test_4 with GroupArray: whole grid at once"""
+    timer = Timer()
+
+    A = item('A')
+    add_mul_rule('A', 'A', A)
+
+    r = 2
+    X = np.linspace(-r, +r, 512)
+    Y = np.linspace(-r, +r, 512)
+
+    timer('prep')
+    V = GroupArray.plane(X, Y, name='A')
+    timer('init')
+
+    V = np.nan_to_num(abs(1 / V))
+    timer('gen')
+
+    # same values as the element-wise Group version
+    assert abs(V[100, 200] - abs(1 / (float(Y[200]) + A * float(X[100])))) < 1e-9
+    matrix_to_heatmap2(V, show=False, interpolation='bicubic', cmap='hot', z_range=[0, 5])
+    timer('map')
+    plt.show()
+
+
+def test_7():
+    """30-term series: Horner vs recomputing x ** i for every term"""
+    A = item('A')
+    add_mul_rule('A', 'A', -1)
+    x = .3 + .4 * A
+    timer = Timer()
+
+    y1 = sum([x ** i / fact(i) for i in range(30)])
+    timer('naive')
+    y2 = x.series('exp', order=29)
+    timer('horner')
+
+    assert abs(y1 - y2) < 1e-12
+    assert abs(x ** 13 - x ** 6 * x ** 7) < 1e-12
+    assert abs(x ** -3 * x ** 3 - 1) < 1e-12
+
+
+def abs_inverse_on_plane(algebra, r=2, n=128):
+    """|1 / (y + A x)| on a n x n grid of [-r, r] x [-r, r] (0 where not invertible)"""
+    X = np.linspace(-r, +r, n)
+    return np.nan_to_num(abs(1 / GroupArray.plane(X, X, name='A', algebra=algebra)))
+
+
+def test_8():
+    """independent algebras side by side, and in a process pool"""
+    specs = {'A^2 = -1': {'A A': -1},
+             'A^2 = 0': {'A A': 0},
+             'A^2 = +1': {'A A': 1},
+             'A^2 = A': {'A A': {'A': 1}},
+             'A^2 = A+1': {'A A': {'1': 1, 'A': 1}}}
+    algebras = [Algebra.from_rules(specs[i]).finalize() for i in specs]
+
+    squares = [a.item('A') * a.item('A') for a in algebras]
+    assert [str(i) for i in squares] == ['- 1', '0', '+ 1', '+ A', '+ 1 + A']
+    try:
+        algebras[0].item('A') + algebras[1].item('A')
+    except ValueError:
+        pass
+    else:
+        assert False
+
+    timer = Timer()
+    with ProcessPoolExecutor() as pool:
+        images = list(pool.map(abs_inverse_on_plane, algebras))
+    timer('pool')
+    for a, image in zip(algebras, images):
+        assert np.allclose(image, abs_inverse_on_plane(a))
+
+
+def test_9():
+    """tiled parallel render == whole-grid GroupArray"""
+    rules = {'A A': {'1': 1, 'A': 1}}
+    algebra = Algebra.from_rules(rules)
+
+    image = render(rules, 'z^-1', window=(-2, 2, -2, 2), resolution=128, tile=50)
+    assert np.allclose(image, abs_inverse_on_plane(algebra, r=2, n=128), rtol=1e-5)
+
+    image = render(rules, 'sin', window=(-1, 1, -2, 2), resolution=(64, 96), tile=32)
+    z = GroupArray.plane(np.linspace(-1, 1, 64), np.linspace(-2, 2, 96), algebra=algebra)
+    assert np.allclose(image, abs(z.sin()), rtol=1e-5)
+
+    timer = Timer()
+    image = render(rules, 'z^-1', resolution=4096, tile=512)
+    timer('4096 x 4096')
+    matrix_to_heatmap2(image, show=False, interpolation='bicubic', cmap='hot', z_range=[0, 5])
+    plt.show()
+
+
+def test_10():
+    """1 / x is the left inverse (y * x = 1) in a non-associative algebra, as in the dict implementation"""
+    algebra = Algebra.from_rules({'A A': {'B': 1, '1': 1}, 'A B': {'A': 1}, 'B A': {'A': -1, 'B': 2}, 'B B': {'1': 1, 'A': 1}})
+    algebra.finalize()
+    x = algebra.item('1') + 2 * algebra.item('A') + .5 * algebra.item('B')
+    y = 1 / x
+    assert np.allclose(y.vector(), [-1.12, 1.147, -.347], atol=1e-3), y
+    assert np.allclose((y * x).vector(), [1, 0, 0])
+    assert not np.allclose((x * y).vector(), [1, 0, 0])
+    right = Group.from_vector(algebra.inverse(x.vector(), side='right'), algebra)
+    assert np.allclose((x * right).vector(), [1, 0, 0])
+
+    z = GroupArray.plane(np.linspace(-1, 1, 5), np.linspace(-1, 1, 4), name='A', algebra=algebra) + .5 * x
+    w = (z.inverse() * z).coeffs
+    w = w[~np.isnan(w).any(axis=-1)]
+    assert len(w) and np.allclose(w, [1, 0, 0])
+
+
+def test_11():
+    """powers are taken left to right if the algebra is not power-associative"""
+    algebra = Algebra.from_rules({'A A': {'B': 1, '1': 1}, 'A B': {'A': 1}, 'B A': {'A': -1, 'B': 2}, 'B B': {'1': 1, 'A': 1}})
+    algebra.finalize()
+    assert not algebra.is_power_associative()
+    x = algebra.item('1') + 2 * algebra.item('A') + .5 * algebra.item('B')
+    assert np.allclose((x ** 5).vector(), [128.81, -309.56, 1236.28], atol=.01)
+    assert np.allclose((x ** 5).vector(), ((((x * x) * x) * x) * x).vector())
+
+    algebra = Algebra.from_rules({'A A': {'1': 1, 'A': 1}}).finalize()
+    assert algebra.is_power_associative()
+
+
 if __name__ == '__main__':
     # test_2()
     test_4()
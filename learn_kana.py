@@ -52,6 +52,79 @@ def pick(v):
             return i
 
 
+class Sampler:
+    """weighted random index, Fenwick tree over the weights: O(log n) update and sample"""
+    def __init__(self, weights):
+        self.weights = list(weights)
+        self.n = len(self.weights)
+        self.positive = sum(w > 0 for w in self.weights)     # items that can be drawn
+        self.tree = [0.] + self.weights
+        for i in range(1, self.n + 1):     # O(n) build
+            j = i + (i & -i)
+            if j <= self.n:
+                self.tree[j] += self.tree[i]
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        return self.weights[i]
+
+    def __setitem__(self, i, w):
+        self.update(i, w)
+
+    def update(self, i, w):
+        """set the weight of item i"""
+        d = w - self.weights[i]
+        self.positive += (w > 0) - (self.weights[i] > 0)
+        self.weights[i] = w
+        if not self.positive:   # drop the rounding errors left in the tree
+            self.tree = [0.] * (self.n + 1)
+            return
+        i += 1
+        while i <= self.n:
+            self.tree[i] += d
+            i += i & -i
+
+    def total(self):
+        s, i = 0., self.n
+        while i > 0:
+            s += self.tree[i]
+            i -= i & -i
+        return s
+
+    def sample(self):
+        """index i with probability weights[i] / total (uniform if all the weights are 0, like pick)"""
+        if not self.positive:
+            return int(random() * self.n)
+        r = random() * max(self.total(), 0.)
+        i, step = 0, 1 << self.n.bit_length()
+        while step:
+            if i + step <= self.n and self.tree[i + step] <= r:
+                i += step
+                r -= self.tree[i]
+            step >>= 1
+        if i < self.n and self.weights[i] > 0:
+            return i
+        # rounding errors in the tree: nearest item of positive weight
+        i = min(i, self.n - 1)
+        for j in range(i, -1, -1):
+            if self.weights[j] > 0:
+                return j
+        return next(j for j in range(i, self.n) if self.weights[j] > 0)
+
+    def sample_batch(self, k):
+        """k distinct indices drawn one after the other without replacement (items of weight 0 are never drawn)"""
+        original = {}   # weights before the batch, in order of drawing
+        for _ in range(min(k, self.positive)):
+            i = self.sample()
+            original[i] = self.weights[i]
+            self.update(i, 0.)
+        for i, w in original.items():     # restore the weights
+            self.update(i, w)
+        return list(original)
+
+
 def load_alphabet(url, path):
     """return alphabet as dicts of char: name"""
     f = File(url=url, path=path, separator=' ')
@@ -111,15 +184,17 @@ def update(problem, solution, data):
 def quiz(alphabet):
     """quiz"""
     data = load_data(DATA)
+    chars = list(alphabet)
+    columns = [data[k][chars].tolist() for k in ('attempts', 'correct', 'time')]
+    sampler = Sampler(probability(*i) for i in zip(*columns))
 
     while True:
-        chars = ''.join(i for i in alphabet)
-        prob = [probability(data['attempts'][i], data['correct'][i], data['time'][i]) for i in chars]
-        n = pick(prob)
+        n = sampler.sample()
         problem = chars[n]
         solution = alphabet[problem]
         data = update(problem, solution, data)
         save_data(DATA, data)
+        sampler.update(n, probability(*(data.loc[problem, k] for k in ('attempts', 'correct', 'time'))))
 
 
 def test_1():
@@ -128,6 +203,21 @@ def test_1():
     input()
 
 
+def test_2():
+    """sample_batch never repeats, never draws weight 0 and leaves the weights as they were"""
+    for _ in range(1000):
+        n = int(random() * 30) + 1
+        sampler = Sampler(0. if random() < .3 else 10 ** (12 * random() - 6) for _ in range(n))
+        for _ in range(50):
+            sampler.update(int(random() * n), 0. if random() < .3 else 10 ** (12 * random() - 6))
+        weights = list(sampler.weights)
+        batch = sampler.sample_batch(n + 2)
+        assert len(batch) == len(set(batch)) == sum(w > 0 for w in weights)
+        assert all(weights[i] > 0 for i in batch)
+        assert sampler.weights == weights
+        assert sampler.positive == sum(w > 0 for w in weights)
+
+
 def show_times():
     data = File(DATA)()
 
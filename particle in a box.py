@@ -2,6 +2,11 @@
 Particle in a box with Quantum Mechanics
 This program computes the first energy levels of an n-dimensional box
 """
+import numpy as np
+from math import isqrt, prod, factorial
+from heapq import heappush, heappop
+
+PRIMES = [2147483647, 2147483629, 2147483587, 2147483579, 2147483563, 2147483549, 2147483543, 2147483497]
 
 def recursive_iter(depth=1, *args):
     """
@@ -19,29 +24,145 @@ def recursive_iter(depth=1, *args):
                 yield (i,) + j
 
 
-def gen(n_max=7, dim=3):
-    """:returns list of [n energy level, energy, degeneracy]"""
-    d = {}  # store {energy: degeneracy}
-    for indices in recursive_iter(dim, 1, n_max+1):
-        # print(indices)
-        n = sum([i**2 for i in indices])
-        if n <= n_max ** 2 + 2:  # correct only up to 1**2 + 1**2 + n_max**2
-            if n in d:
-                d[n] += 1
-            else:
-                d.update({n:1})
+def count_degeneracies(E_max, dim=3):
+    """
+    exact number of tuples (n1, ..., n_dim), n_i >= 1, with n1**2 + ... + n_dim**2 = E, for every E <= E_max
+    (dim-fold convolution of the indicator of the squares)
+    :return: list of int, index = E
+    """
+    squares = [i ** 2 for i in range(1, isqrt(E_max) + 1)]
+    bound = max(len(squares), 1) ** dim     # no count is larger
+
+    # int64 if the counts fit, otherwise modulo primes < 2**31 (len(squares) additions can't overflow)
+    # recombined with the chinese remainder theorem
+    if bound < 2 ** 62:
+        moduli = [None]
+    else:
+        moduli, m = [], 1
+        for p in PRIMES:
+            moduli.append(p)
+            m *= p
+            if m > bound:
+                break
+        else:
+            raise ValueError(f'counts up to {bound} do not fit the product of PRIMES ({m}), add more primes')
+
+    counts = []
+    for p in moduli:
+        c = np.zeros(E_max + 1, dtype=np.int64)
+        c[0] = 1
+        for d in range(dim):
+            new = np.zeros_like(c)
+            for s in squares:
+                new[s + d:] += c[d:E_max + 1 - s]    # c is 0 below d
+            c = new if p is None else new % p
+        counts.append(c)
+
+    if moduli == [None]:
+        return counts[0].tolist()
+    m = prod(moduli)
+    out = np.zeros(E_max + 1, dtype=object)
+    for p, c in zip(moduli, counts):
+        mp = m // p
+        out = (out + c.astype(object) * (mp * pow(mp, -1, p))) % m
+    return out.tolist()
+
+
+def gen(n_max=7, dim=3, E_max=None):
+    """
+    :returns list of [n energy level, energy, degeneracy] for all energies <= E_max
+    (default n_max**2 + dim - 1 = 1**2 + ... + 1**2 + n_max**2, where all the n_i <= n_max are complete)
+    """
+    if E_max is None:
+        E_max = n_max ** 2 + dim - 1
+    d = count_degeneracies(E_max, dim)
 
     out = []    # store [n energy level, energy, degeneracy]
-    for i in sorted(d.keys()):
-        out += [[len(out)+1, i, d[i]]]
+    for i in range(len(d)):
+        if d[i]:
+            out += [[len(out)+1, i, d[i]]]
 
     return out
 
 
-def pprint(n_max=7, dim=3):
+def permutations(indices):
+    """number of distinct orderings of indices"""
+    out = factorial(len(indices))
+    for i in set(indices):
+        out //= factorial(indices.count(i))
+    return out
+
+
+def first_ascent(indices):
+    """first position i where indices[i] > indices[i - 1] (indices[-1] counts as 1)"""
+    prev = 1
+    for i, n in enumerate(indices):
+        if n > prev:
+            return i
+        prev = n
+    return len(indices)
+
+
+def levels(dim=3, max_levels=None, max_states=None, method='heap'):
+    """
+    lazily yield (n energy level, energy, degeneracy) in increasing energy
+    :param max_levels: stop after this many levels
+    :param max_states: stop once the cumulative degeneracy reaches max_states
+    :param method: 'heap': only sorted tuples n1 <= ... <= n_dim are visited, from a priority queue, memory ~ size
+    of the frontier, time ~ number of states;
+    'counts': count_degeneracies() on doubling energy ranges, memory ~ energy, time ~ energy ** 1.5 (much faster
+    when the degeneracies are large, e.g. dim >= 4)
+    """
+    if method == 'counts':
+        yield from levels_by_counts(dim, max_levels, max_states)
+        return
+    elif method != 'heap':
+        raise ValueError(f'unknown method {method}')
+
+    start = (1,) * dim
+    frontier = [(dim, start)]
+    level = states = 0
+
+    while frontier:
+        energy = frontier[0][0]
+        deg = 0
+        while frontier and frontier[0][0] == energy:
+            _, indices = heappop(frontier)
+            deg += permutations(indices)
+            # each sorted tuple is reached from one parent only: the one with the first ascent decremented
+            for j in range(dim):
+                if j + 1 == dim or indices[j] < indices[j + 1]:
+                    child = indices[:j] + (indices[j] + 1,) + indices[j + 1:]
+                    if first_ascent(child) == j:
+                        heappush(frontier, (energy + 2 * indices[j] + 1, child))
+
+        level += 1
+        states += deg
+        yield level, energy, deg
+        if (max_levels is not None and level >= max_levels) or (max_states is not None and states >= max_states):
+            return
+
+
+def levels_by_counts(dim=3, max_levels=None, max_states=None):
+    """levels(method='counts')"""
+    level = states = 0
+    E_min, E_max = 0, 4 * dim
+    while True:
+        d = count_degeneracies(E_max, dim)
+        for energy in range(E_min, E_max + 1):
+            if d[energy]:
+                level += 1
+                states += d[energy]
+                yield level, energy, d[energy]
+                if (max_levels is not None and level >= max_levels) or (max_states is not None and states >= max_states):
+                    return
+        E_min, E_max = E_max + 1, 2 * E_max
+
+
+def pprint(n_max=7, dim=3, E_max=None):
     """pretty-print gen()"""
     print(f'\n{"n":>4} \t{"E":>4} \t{"deg":>4}\n')
-    for i in gen(n_max=n_max, dim=dim):
+    for i in gen(n_max=n_max, dim=dim, E_max=E_max):
         print(f'{i[0]:4} \t{i[1]:4} \t{i[2]:4}')
 
 
@@ -13,12 +13,21 @@ from __misc__.animated_plot import *
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 from numpy import pi, exp, sin
+from functools import lru_cache
+from scipy.fft import dst
+from scipy.linalg.lapack import zgttrf, zgttrs
+from matplotlib.image import imsave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tempfile import NamedTemporaryFile
+import os
+import numpy as np
 
 
-i_ = np.complex(0, 1)
+i_ = 1j
 
 
-def animated_plot(x, y, dt=.01, yrange=None):
+def animated_plot(x, y, dt=.01, yrange=None, yscale=None):
+    """animation of y(t) (y(t) is computed at draw time); without yrange, yscale sets the top at yscale * max(y(0))"""
 
     def init():
         # only required for blitting to give a clean slate.
@@ -30,16 +39,27 @@ def animated_plot(x, y, dt=.01, yrange=None):
         return line,
 
     fig, ax = plt.subplots()
+    y0 = y(0)
     if yrange:
         plt.ylim(bottom=yrange[0], top=yrange[1])
+    elif yscale:
+        plt.ylim(bottom=0, top=max(y0) * yscale)
 
-    line, = ax.plot(x, y(0))
+    line, = ax.plot(x, y0)
 
     return animation.FuncAnimation(fig, animate, init_func=init, interval=2, blit=True, save_count=50)
 
 
+@lru_cache(maxsize=32)
+def lattice(length, n):
+    """n points from 0 to length, shared (read-only) by all the WaveFunctions on the same lattice"""
+    x = np.linspace(0, length, n)
+    x.flags.writeable = False
+    return x
+
+
 class WaveFunction:
-    """lattice of n points, values are given by fun"""
+    """lattice of n points, values are given by fun (complex128 array y, grid x shared between instances)"""
     def __init__(self, fun=None, y=None, x_range=None, length=1., n=None):
         if y is not None:
             n = len(y)
@@ -51,56 +71,81 @@ class WaveFunction:
             self.length = x_range[1] - x_range[0]
         self.n = n
         self.dx = self.length / (self.n-1)
-        self.x = np.array([i * self.dx for i in range(n)])
+        self.x = lattice(self.length, n)
 
-        if y is None:
-            self.y = np.ones(len(self.x))
-        else:
-            self.y = y
         if fun is not None:
-            self.y = np.array([fun(i) for i in self.x])
+            self.y = self.sample(fun)
+        elif y is None:
+            self.y = np.ones(n, dtype=np.complex128)
+        else:
+            self.y = np.array(y, dtype=np.complex128)
+
+    def sample(self, fun):
+        """fun on the whole lattice: one call if fun is vectorized, np.vectorize otherwise"""
+        try:
+            y = np.asarray(fun(self.x), dtype=np.complex128)
+        except (TypeError, ValueError):     # e.g. "if x < ..." on an array
+            y = None
+        if y is not None and y.ndim == 0:
+            return np.full(self.n, y, dtype=np.complex128)
+        if y is None or y.shape != self.x.shape:
+            y = np.vectorize(fun, otypes=[np.complex128])(self.x)
+        return y
+
+    def new(self, y):
+        """WaveFunction on the same lattice with values y (not copied)"""
+        out = object.__new__(WaveFunction)
+        out.length, out.x_range, out.n, out.dx, out.x = self.length, self.x_range, self.n, self.dx, self.x
+        out.y = y
+        return out
 
     def __len__(self):
         return len(self.y)
 
     def __mul__(self, other):
         if type(other) == WaveFunction:
-            y = np.array([self.y[i] * other.y[i] for i in range(len(self))])
-            return WaveFunction(y=y, length=self.length, n=self.n)
-        if type(other) in [float, int, np.complex, np.complex128]:
-            y = np.array([self.y[i] * other for i in range(len(self))])
-            return WaveFunction(y=y, length=self.length, n=self.n)
+            return self.new(self.y * other.y)
+        if np.isscalar(other):
+            return self.new(self.y * other)
+        return NotImplemented
 
     def __rmul__(self, other):
         return self * other
 
+    def __imul__(self, other):
+        self.y *= other.y if type(other) == WaveFunction else other
+        return self
+
     def __add__(self, other):
         if type(other) == WaveFunction:
-            y = np.array([self.y[i] + other.y[i] for i in range(len(self))])
-            return WaveFunction(y=y, length=self.length, n=self.n)
+            return self.new(self.y + other.y)
+        return NotImplemented
+
+    def __iadd__(self, other):
+        self.y += other.y
+        return self
 
     def square_module(self):
-        v = [abs(i)**2 for i in self.y]
-        return (sum(v) - (v[0] + v[-1]) / 2) * self.dx
+        v = self.distribution()
+        return (v.sum() - (v[0] + v[-1]) / 2) * self.dx
 
     def distribution(self):
-        return [abs(i)**2 for i in self.y]
+        return self.y.real ** 2 + self.y.imag ** 2
 
     def integral(self):
-        return (sum(self.y) - (self.y[0] + self.y[-1]) / 2) * self.dx
+        return (self.y.sum() - (self.y[0] + self.y[-1]) / 2) * self.dx
 
     def normalize(self):
         area = self.square_module()
         if area:
-            for i in range(len(self)):
-                self.y[i] /= area
+            self.y /= area
         return self
 
     def real(self):
-        return [i.real for i in self.y]
+        return self.y.real
 
     def imag(self):
-        return [i.imag for i in self.y]
+        return self.y.imag
 
     def __iter__(self):
         return iter(self.y)
@@ -112,6 +157,179 @@ class WaveFunction:
         return ''
 
 
+class Expansion:
+    """
+    wave function as a series of eigenstates: psi(t) = sum_n coeff[n] exp(-i energy[n] t / h_) basis[n]
+    each frame is one (order,) @ (order, N) product, a whole trajectory one (T, order) @ (order, N) product
+    """
+    def __init__(self, basis, energy, coeff, x=None, h_=1.):
+        self.basis = np.asarray(basis, dtype=np.complex128)     # (order, N)
+        self.energy = np.asarray(energy, dtype=float)
+        self.coeff = np.asarray(coeff, dtype=np.complex128)
+        self.x = x
+        self.h_ = h_
+
+    def phases(self, t):
+        """time-dependent coefficients, shape (order,) for a time, (T, order) for an array of times"""
+        return self.coeff * np.exp(- i_ * np.multiply.outer(t, self.energy) / self.h_)
+
+    def psi(self, t):
+        """wave function at time t (N,), or at each of the times t (T, N)"""
+        return self.phases(t) @ self.basis
+
+    def trajectory(self, times):
+        """(T, N) wave function at all the times in one matrix product"""
+        return self.psi(np.asarray(times, dtype=float))
+
+    def distribution(self, t):
+        """square module of the wave function"""
+        y = self.psi(t)
+        return y.real ** 2 + y.imag ** 2
+
+
+class SineExpansion(Expansion):
+    """Expansion on the box eigenstates sin(n pi x / a), normalized like WaveFunction.normalize(),
+    psi(t) is a discrete sine transform of the coefficients (no (order, N) basis is stored)"""
+    def __init__(self, energy, coeff, x, h_=1.):
+        self.basis = None
+        self.energy = np.asarray(energy, dtype=float)
+        self.coeff = np.asarray(coeff, dtype=np.complex128)
+        self.x = x
+        self.h_ = h_
+
+    @staticmethod
+    def project(psi, order):
+        """(Psi_n * psi).integral() for n = 1 ... order (order <= psi.n - 2) with one DST"""
+        length = psi.x[-1] - psi.x[0]
+        return dst(psi.y[1:-1], type=1)[:order] * psi.dx / length
+
+    def psi(self, t):
+        c = self.phases(t)
+        n, length = len(self.x), self.x[-1] - self.x[0]
+        padded = np.zeros(c.shape[:-1] + (n - 2,), dtype=np.complex128)
+        padded[..., :c.shape[-1]] = c
+        out = np.zeros(c.shape[:-1] + (n,), dtype=np.complex128)
+        out[..., 1:-1] = dst(padded, type=1, axis=-1) / length
+        return out
+
+
+def project(basis, psi):
+    """(Psi_n * psi).integral() for all the rows Psi_n of basis, as one matrix-vector product"""
+    w = np.full(len(psi), psi.dx)
+    w[0] = w[-1] = psi.dx / 2
+    return basis @ (w * psi.y)
+
+
+def is_box_basis(eigenstates, order, tol=10 ** -12, **kw):
+    """True if eigenstates(n) is sin(n pi x / a) on the lattice (checked for n = 1, 2, order)"""
+    x = WaveFunction(**kw).x
+    a = x[-1] - x[0]
+    for n in sorted({1, 2, order}):
+        y = WaveFunction(fun=eigenstates(n, a=a), **kw).y
+        if np.max(np.abs(y - np.sin(n * pi * x / a))) > tol:
+            return False
+    return True
+
+
+class Propagator:
+    """
+    psi(t) of an initial WaveFunction by time steps of dt on its lattice, walls at both ends (psi = 0)
+    V(x), or V(x, t) if time_dependent, is any (vectorized) potential; the cost of a step does not depend on the state
+    'split-step': exp(-i V dt / 2) exp(-i T dt) exp(-i V dt / 2), T diagonal in the discrete sine basis, O(N log N)
+    'crank-nicolson': (1 + i H dt / 2) psi' = (1 - i H dt / 2) psi, tridiagonal LU factorized once
+    (every step if V depends on time), O(N)
+    """
+    methods = ('split-step', 'crank-nicolson')
+
+    def __init__(self, psi_0, V=None, dt=10 ** -4, m=1., h_=1., method='split-step', time_dependent=False):
+        if method not in self.methods:
+            raise ValueError(f'method must be one of {self.methods}, not {method!r}')
+        self.psi_0 = psi_0
+        self.x = psi_0.x
+        self.V = V
+        self.dt = dt
+        self.m = m
+        self.h_ = h_
+        self.method = method
+        self.time_dependent = time_dependent
+        self.t = 0.
+        self.y = psi_0.y.copy()
+        self.y[0] = self.y[-1] = 0.
+
+        # interior points
+        n, dx = psi_0.n - 2, psi_0.dx
+        if method == 'split-step':
+            k = np.arange(1, n + 1) * pi / psi_0.length
+            self.kinetic = np.exp(- i_ * h_ * k ** 2 / (2 * m) * dt)
+        else:
+            self.hopping = - h_ ** 2 / (2 * m * dx ** 2)    # off-diagonal of H
+        self.v = None if time_dependent else self.potential(0.)
+        if not time_dependent:
+            self.kick = np.exp(- i_ * self.v * dt / (2 * h_))
+            if method == 'crank-nicolson':
+                self.lu = self.factorize(self.v)
+
+    def potential(self, t):
+        """V on the interior points at time t"""
+        if self.V is None:
+            return np.zeros(self.psi_0.n - 2)
+        v = self.psi_0.sample(lambda x: self.V(x, t) if self.time_dependent else self.V(x)).real
+        return v[1:-1]
+
+    def factorize(self, v):
+        """LU of the tridiagonal 1 + i H dt / 2"""
+        c = i_ * self.dt / (2 * self.h_)
+        off = np.full(len(v) - 1, c * self.hopping, dtype=np.complex128)
+        diag = 1 + c * (v - 2 * self.hopping)
+        dl, d, du, du2, ipiv, info = zgttrf(off, diag, off.copy())
+        return dl, d, du, du2, ipiv
+
+    def step(self):
+        """advance the state by dt"""
+        y, t = self.y[1:-1], self.t
+        if self.method == 'split-step':
+            if self.time_dependent:
+                y *= np.exp(- i_ * self.potential(t) * self.dt / (2 * self.h_))
+            else:
+                y *= self.kick
+            y[:] = dst(self.kinetic * dst(y, type=1, norm='ortho'), type=1, norm='ortho')
+            if self.time_dependent:
+                y *= np.exp(- i_ * self.potential(t + self.dt) * self.dt / (2 * self.h_))
+            else:
+                y *= self.kick
+        else:
+            if self.time_dependent:
+                v = self.potential(t + self.dt / 2)
+                lu = self.factorize(v)
+            else:
+                v, lu = self.v, self.lu
+            c = i_ * self.dt / (2 * self.h_)
+            b = (1 - c * (v - 2 * self.hopping)) * y
+            b[1:] -= c * self.hopping * y[:-1]
+            b[:-1] -= c * self.hopping * y[1:]
+            y[:] = zgttrs(*lu, b)[0]
+        self.t = t + self.dt
+
+    def psi(self, t):
+        """wave function at time t (N,), stepping on from the current state (from psi_0 if t is earlier)"""
+        if t < self.t - self.dt / 2:
+            self.t = 0.
+            self.y = self.psi_0.y.copy()
+            self.y[0] = self.y[-1] = 0.
+        for _ in range(int(round((t - self.t) / self.dt))):
+            self.step()
+        return self.y.copy()
+
+    def trajectory(self, times):
+        """(T, N) wave function at each of the (increasing) times"""
+        return np.array([self.psi(t) for t in times])
+
+    def distribution(self, t):
+        """square module of the wave function"""
+        y = self.psi(t)
+        return y.real ** 2 + y.imag ** 2
+
+
 def gen_animation(psi_0, eigenvalues, eigenstates, dt=2**-16, order=10, N=100, m=1.):
     """
     :param psi_0: initial wave function
@@ -121,7 +339,7 @@ def gen_animation(psi_0, eigenvalues, eigenstates, dt=2**-16, order=10, N=100, m
     :param order: series expansion order
     :param N: number of points of the lattice
     :param m: particle mass
-    :return:
+    :return: Expansion of psi_0 (psi(t), trajectory(times), ...)
     """
 
     xrange = (0, 1)  # initial and final coo of the lattice
@@ -131,53 +349,219 @@ def gen_animation(psi_0, eigenvalues, eigenstates, dt=2**-16, order=10, N=100, m
     kw = {'x_range': xrange, 'length': a, 'n': N}
 
     # eigenvalues
-    energy_n = {i: eigenvalues(i, a=a, m=m) for i in range(1, 1 + order)}
-
-    # eigenstates
-    Psi_n = {i: WaveFunction(fun=eigenstates(i, a=a), **kw).normalize() for i in range(1, 1 + order)}
+    energy_n = np.array([eigenvalues(i, a=a, m=m) for i in range(1, 1 + order)])
 
     # initial state
     Psi = WaveFunction(fun=psi_0, **kw)
 
-    # expanxion
-    coeff = {i: (Psi_n[i] * Psi).integral() for i in range(1, 1 + order)}
+    # eigenstates & expansion
+    if order <= N - 2 and is_box_basis(eigenstates, order, **kw):
+        # discrete sine transform, no need to sample the eigenstates
+        coeff = SineExpansion.project(Psi, order)
+        expansion = SineExpansion(energy_n, coeff, x=Psi.x, h_=h_)
+    else:
+        Psi_n = [WaveFunction(fun=eigenstates(i, a=a), **kw).normalize() for i in range(1, 1 + order)]
+        basis = np.array([i.y for i in Psi_n])
+        coeff = project(basis, Psi)
+        expansion = Expansion(basis, energy_n, coeff, x=Psi.x, h_=h_)
 
     print('coefficients:')
     epsilon = 10 ** -5
-    for i in coeff:
+    for i, c in enumerate(coeff, 1):
         print(f'{i:<8}', end='')
-        if abs(coeff[i].real) <= epsilon and abs(coeff[i].imag) <= epsilon:
+        if abs(c.real) <= epsilon and abs(c.imag) <= epsilon:
             print(' 0', end='')
-        if abs(coeff[i].real) > epsilon:
-            print(f' {coeff[i].real:+.4f}', end='')
-        if abs(coeff[i].imag) > epsilon:
-            print(f' {coeff[i].imag:+.4f} i', end='')
+        if abs(c.real) > epsilon:
+            print(f' {c.real:+.4f}', end='')
+        if abs(c.imag) > epsilon:
+            print(f' {c.imag:+.4f} i', end='')
         print()
 
-    def U(n, t):
-        """time evolution operator"""
-        return np.exp(- i_ * energy_n[n] * t / h_)
+    animated_plot(x=expansion.x, y=expansion.distribution, dt=dt, yscale=1.6)
+    plt.show()
+    return expansion
 
-    def c_nt(n, t):
-        """time-dependent version of coefficients()"""
-        return coeff[n] * U(n, t)
 
-    def psi(t):
-        """imaginary part of the wave function"""
-        out = WaveFunction(y=[0 for _ in range(N)], **kw)
+def gen_propagation(psi_0, V=None, dt=.01, steps=10, N=200, m=1, method='split-step', time_dependent=False):
+    """
+    Animates the evolution of psi_0 under the potential V by time steps on the lattice (no eigenstates needed)
+    :param psi_0: initial wave function
+    :param V: potential V(x), or V(x, t) if time_dependent (None for the free box)
+    :param dt: time between frames
+    :param steps: time steps per frame
+    :param N: number of points in the lattice
+    :param m: particle mass
+    :param method: 'split-step' or 'crank-nicolson'
+    :param time_dependent: V takes the time as second argument
+    :return: Propagator of psi_0 (psi(t), trajectory(times), ...)
+    """
+    Psi = WaveFunction(fun=psi_0, x_range=(0, 1), n=N)
+    propagator = Propagator(Psi, V, dt=dt / steps, m=m, method=method, time_dependent=time_dependent)
+    animated_plot(x=propagator.x, y=propagator.distribution, dt=dt, yscale=1.6)
+    plt.show()
+    return propagator
 
-        for i in range(1, 1 + order):
-            out += Psi_n[i] * c_nt(i, t)
 
-        return out
+def gaussian_packets(x, x0=.5, v=10, w=1/15):
+    """(M, N) stack of the packets exp(2 pi i v x) exp(-((x - x0) / w)^2), one for each x0, v, w (broadcast)"""
+    x0, v, w = (np.reshape(i, (-1, 1)) for i in np.broadcast_arrays(x0, v, w))
+    return exp(v * i_ * 2 * pi * x) * exp(-((x - x0) / w) ** 2)
 
-    def distribution(t):
-        """square module of the wave function"""
-        return psi(t).distribution()
 
-    animated_plot(x=[i * a / (N-1) for i in range(N)], y=distribution,
-                  dt=dt, yrange=[0, max(distribution(0))*1.6])
+def ensemble(psi_0, eigenvalues, eigenstates, times, order=40, N=200, m=1, revival=.9, chunk=1024):
+    """
+    Evolves a stack of initial states in the eigenbasis at once, returns observables instead of animations
+    (the basis is normalized to 1 here, so that the observables are physical)
+    :param psi_0: (M, N) initial states on the lattice (see gaussian_packets), or a list of functions
+    :param eigenvalues: function that returns the n-th eigenvalue
+    :param eigenstates: function that returns the n-th eigenstate
+    :param times: (T,) time grid
+    :param order: number of eigenstates
+    :param N: number of points in the lattice
+    :param m: particle mass
+    :param revival: the revival time is the first time the survival probability climbs back to this value
+    :param chunk: members evaluated together, memory is (chunk, order^2 / 2) complex
+    :return: dict of 'coeff' (M, order), 'x' and 'p' <x>, <p> (M, T), 'survival' |<psi_0|psi(t)>|^2 (M, T),
+        'revival' (M,) (nan if it never happens)
+    """
+    xrange = (0, 1)  # initial and final coo of the lattice
+    h_ = 1  # reduced planck's constant (1 for simplicity)
+    a = xrange[1] - xrange[0]  # length of the lattice
+    kw = {'x_range': xrange, 'length': a, 'n': N}
+    x, dx = lattice(a, N), a / (N - 1)
+    times = np.asarray(times, dtype=float)
+
+    if callable(psi_0[0]):
+        psi_0 = [WaveFunction(fun=f, **kw).y for f in psi_0]
+    psi_0 = np.asarray(psi_0, dtype=np.complex128)
+
+    # basis (order, N) normalized to 1, trapezoid weights
+    energy = np.array([eigenvalues(i, a=a, m=m) for i in range(1, 1 + order)])
+    basis = np.array([WaveFunction(fun=eigenstates(i, a=a), **kw).y for i in range(1, 1 + order)])
+    wt = np.full(N, dx)
+    wt[0] = wt[-1] = dx / 2
+    basis /= np.sqrt((np.abs(basis) ** 2) @ wt)[:, None]
+
+    # all the coefficients, <x> and <p> in the basis
+    bw = basis.conj() * wt
+    coeff = psi_0 @ bw.T
+    x_nm = (bw * x) @ basis.T
+    p_nm = - i_ * h_ * bw @ np.gradient(basis, dx, axis=1).T
+    norm = (np.abs(coeff) ** 2).sum(axis=1)
+
+    # survival amplitude sum_n |c_n|^2 exp(-i E_n t)
+    amplitude = (np.abs(coeff) ** 2) @ np.exp(- i_ * np.multiply.outer(energy, times) / h_)
+    survival = np.abs(amplitude) ** 2 / norm[:, None] ** 2
+
+    # <A>(t) = sum_n |c_n|^2 A_nn + 2 Re sum_n<m conj(c_n) c_m A_nm exp(i (E_n - E_m) t) for A = x, p (hermitian part)
+    n, k = np.triu_indices(order, 1)
+    theta = np.multiply.outer((energy[n] - energy[k]) / h_, times)
+    cos, sin = np.cos(theta), np.sin(theta)
+    x_t = np.empty((len(psi_0), len(times)))
+    p_t = np.empty((len(psi_0), len(times)))
+    for a_nm, out in ((x_nm, x_t), (p_nm, p_t)):
+        a_nm = (a_nm + a_nm.conj().T) / 2
+        for i in range(0, len(psi_0), chunk):
+            c = coeff[i:i + chunk]
+            pairs = 2 * c[:, n].conj() * c[:, k] * a_nm[n, k]
+            out[i:i + chunk] = ((np.abs(c) ** 2) @ a_nm.diagonal().real)[:, None] + pairs.real @ cos - pairs.imag @ sin
+    x_t /= norm[:, None]
+    p_t /= norm[:, None]
+
+    # first return above revival after dropping below it
+    below = survival < revival
+    back = (np.cumsum(below, axis=1) > 0) & ~below
+    first = back.argmax(axis=1)
+    revival_t = np.where(back.any(axis=1), times[first], np.nan)
+
+    return {'coeff': coeff, 'x': x_t, 'p': p_t, 'survival': survival, 'revival': revival_t}
+
+
+def export_chunk(source, path, shape, dt, rows):
+    """write |psi(i dt)|^2 for the frames i in range(*rows) into the memmap at path (see export_frames)"""
+    y = source.trajectory(np.arange(rows[0], rows[1]) * dt)
+    frames = np.memmap(path, dtype=np.float32, mode='r+', shape=shape)
+    frames[rows[0]:rows[1]] = y.real ** 2 + y.imag ** 2
+    frames.flush()
+
+
+def export_frames(source, dt, n_frames, chunk=256, path=None, workers=None):
+    """
+    headless version of animated_plot: the whole |psi(x, t)|^2 trajectory, computed chunk by chunk
+    :param source: Expansion (chunks go to a process pool) or Propagator (chunks in order, it steps in time)
+    :param dt: time between frames
+    :param n_frames: number of frames T (frame i is at time i dt)
+    :param chunk: frames per chunk
+    :param path: file of the output memmap, owned by the caller (None: a temporary file, removed once the frames are
+    copied in memory)
+    :param workers: max_workers of the ProcessPoolExecutor (0 computes in this process)
+    :return: (T, N) float32 memmap (array if path is None)
+    """
+    shape = (n_frames, len(source.x))
+    temporary = path is None
+    if temporary:
+        with NamedTemporaryFile(suffix='.dat', delete=False) as file:
+            path = file.name
+
+    try:
+        memmap = np.memmap(path, dtype=np.float32, mode='w+', shape=shape)
+        chunks = [(i, min(i + chunk, n_frames)) for i in range(0, n_frames, chunk)]
+
+        if workers == 0 or isinstance(source, Propagator):
+            for rows in chunks:
+                export_chunk(source, path, shape, dt, rows)
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                jobs = [pool.submit(export_chunk, source, path, shape, dt, rows) for rows in chunks]
+                for job in as_completed(jobs):
+                    job.result()    # raise errors of the workers
+        frames = np.array(memmap) if temporary else memmap
+    finally:
+        if temporary:
+            memmap = None   # close the file before removing it
+            os.remove(path)
+    return frames
+
+
+def frame_image(y, height=256, top=None):
+    """filled plot of y (N,) as a (height, N) image buffer, y = top at the upper edge (no matplotlib artists)"""
+    if top is None:
+        top = y.max() or 1.
+    levels = (np.arange(height, 0, -1) - .5) / height * top
+    return (levels[:, None] <= y[None, :]).astype(np.float32)
+
+
+def write_frames(frames, path, x=None, dt=None, height=256, yscale=1.6, cmap='gray'):
+    """
+    write the (T, N) frames of export_frames as an .npz archive (path ending in .npz)
+    or as the PNG sequence path % i (e.g. 'frames/%05d.png'), with the same scale for every frame
+    """
+    if path.endswith('.npz'):
+        extra = {k: v for k, v in (('x', x), ('dt', dt)) if v is not None}
+        np.savez(path, distribution=frames, **extra)
+        return
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    top = frames[0].max() * yscale
+    for i, y in enumerate(frames):
+        imsave(path % i, frame_image(y, height, top), cmap=cmap, vmin=0, vmax=1)
+
+
+def replay(path, interval=20):
+    """play an .npz archive of write_frames at a steady frame rate (frames are not computed at draw time)"""
+    data = np.load(path)
+    frames = data['distribution']
+    dt = float(data['dt']) if 'dt' in data else 1.
+    x = data['x'] if 'x' in data else np.arange(frames.shape[1])
+
+    def y(t):
+        return frames[int(round(t / dt)) % len(frames)]
+
+    anim = animated_plot(x=x, y=y, dt=dt, yscale=1.6)
+    anim.event_source.interval = interval
     plt.show()
+    return anim
 
 
 if __name__ == '__main__':
@@ -208,3 +592,4 @@ if __name__ == '__main__':
         return f_
 
     gen_animation(initial_wave_function, E_n, psi_n, dt=2**-14, order=40, N=200)
+    # gen_propagation(initial_wave_function, lambda x: 10 ** 4 * (x - .5) ** 2, dt=2**-14, steps=4, N=200)
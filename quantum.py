@@ -1,7 +1,17 @@
 """find the emission spectrum of a quantum system, provided potential V(x)"""
 import numpy as np
+from scipy.linalg import eigh_tridiagonal, eig_banded
+from scipy import sparse
+from scipy.sparse.linalg import eigsh, LinearOperator, cg
+from scipy.fft import dstn
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from hashlib import sha1
+import importlib.util
+import os
 from omar_utils import *
 import matplotlib.pyplot as plt
+from matplotlib.image import imsave
 from math import pi
 
 
@@ -25,34 +35,327 @@ J__eV = 6.242 * 10 ** 18
 # ----------------------------------------------------------------
 
 
-def solve_H(V_, interval, N=10):
-
+def sample_potential(V_, x):
+    """V_ on the whole lattice x: one call if V_ is vectorized, np.vectorize if it only takes scalars
+    (V_ can also be the array of the samples)"""
+    if isinstance(V_, np.ndarray):
+        if V_.shape != x.shape:
+            raise ValueError(f'{V_.shape} potential samples for a lattice of {x.shape} points')
+        return V_.astype(float)
+    try:
+        v = np.asarray(V_(x), dtype=float)
+    except (TypeError, ValueError):     # e.g. "if abs(x) < ..." on an array
+        v = None
+    if v is not None and v.ndim == 0:   # constant potential
+        return np.full(x.shape, float(v))
+    if v is None or v.shape != x.shape:
+        v = np.vectorize(V_, otypes=[float])(x)
+    return v
+
+
+# central differences of -f'' * delta^2: coefficients of f[i], f[i +- 1], f[i +- 2], ...
+STENCILS = {3: [2., -1.],
+            5: [30 / 12, -16 / 12, 1 / 12],
+            7: [490 / 180, -270 / 180, 27 / 180, -2 / 180]}
+
+
+def kinetic_band(N, stencil=3):
+    """
+    -f'' * delta^2 on N points between two walls (f = 0 outside the box, mirrored as -f beyond the walls),
+    as a symmetric band matrix in upper form (see scipy.linalg.eig_banded)
+    """
+    coeff = STENCILS[stencil]
+    u = len(coeff) - 1
+    band = np.zeros((u + 1, N))
+    for m in range(u + 1):
+        band[u - m, m:] = coeff[m]
+
+    # points beyond the walls: f[-p] = -f[p] (wall at index -1 / N)
+    for m in range(2, u + 1):
+        for i in range(m - 1):
+            j = m - i - 2   # mirrored point
+            if i <= j < N:
+                band[u + i - j, j] -= coeff[m]
+                band[u + i - j, N - 1 - i] -= coeff[m]
+    return band
+
+
+def adaptive_grid(V_, interval, N, strength=10., resolution=20):
+    """
+    N inner points, denser where V_ varies quickly (density ~ 1 + strength * |V'| / max |V'|), for solve_H(grid=...)
+    :param resolution: samples of V_ per grid point used to estimate V'
+    """
+    x = np.linspace(interval[0], interval[1], resolution * (N + 1) + 1)
+    slope = np.abs(np.gradient(sample_potential(V_, x), x))
+    # smear over a few grid cells, so that steps in V_ refine their neighbourhood too
+    slope = np.convolve(slope, np.ones(4 * resolution) / (4 * resolution), mode='same')
+    density = 1 + (strength * slope / slope.max() if slope.max() > 0 else 0)
+    cdf = np.concatenate([[0], np.cumsum((density[1:] + density[:-1]) / 2 * np.diff(x))])
+    return np.interp(np.arange(1, N + 1) / (N + 1) * cdf[-1], cdf, x)
+
+
+def solve_H(V_, interval, N=10, k=None, method='dense', stencil=3, grid=None):
+    """
+    energy eigenvalues & eigenvectors of a particle in the potential V_ on a lattice of N points
+    :param method: 'dense' (np.linalg.eig of the full matrix), 'tridiagonal' (symmetric tridiagonal solver,
+    O(N) memory, sorted eigenvalues and matching eigenvectors, 3-point stencil only) or 'banded' (symmetric band
+    solver, any stencil)
+    :param k: compute only the lowest k eigenpairs ('tridiagonal' and 'banded')
+    :param stencil: 3, 5 or 7-point finite differences (uniform lattice)
+    :param grid: N increasing points inside interval (e.g. adaptive_grid()) instead of the uniform lattice,
+    3-point differences; the eigenvectors are normalized as sum(w * psi**2) = 1 with w the cell widths in units of
+    delta (w = 1 on the uniform lattice, where sum(psi**2) = 1 as well)
+    """
     length_ = interval[1] - interval[0]
     delta = length_ / (N + 1)
     lam = h_**2 / (2 * m_e * delta**2)
 
-    # hamiltonian operator
-    H = np.zeros((N, N))
-    for i in range(N):
-        x = interval[0] + delta * (i + 1)   # todo test
-        H[i, i] = 2 + V_(x) / lam
-    for i in range(N-1):
-        H[i, i + 1] = -1
-        H[i + 1, i] = -1
+    # hamiltonian operator (in units of lam) as a band matrix
+    if grid is None:
+        x = lattice(interval, N)
+        band = kinetic_band(N, stencil)
+    else:
+        if stencil != 3:
+            raise ValueError('non-uniform grids use the 3-point stencil')
+        x = np.asarray(grid, dtype=float)
+        N = len(x)
+        # symmetrized 3-point differences: phi = sqrt(w) psi, spacings in units of delta
+        spacing = np.diff(np.concatenate([[interval[0]], x, [interval[1]]])) / delta
+        w = (spacing[:-1] + spacing[1:]) / 2
+        band = np.zeros((2, N))
+        band[1] = (1 / spacing[:-1] + 1 / spacing[1:]) / w
+        band[0, 1:] = -1 / (spacing[1:-1] * np.sqrt(w[:-1] * w[1:]))
+    band[-1] += sample_potential(V_, x) / lam
+
+    select = {} if k is None else {'select': 'i', 'select_range': (0, min(k, N) - 1)}
+    if method == 'tridiagonal':
+        if len(band) != 2:
+            raise ValueError('the tridiagonal solver needs the 3-point stencil')
+        e_val, e_vec = eigh_tridiagonal(band[1], band[0, 1:], **select)
+        e_val = e_val * lam
+
+    elif method == 'banded':
+        e_val, e_vec = eig_banded(band, **select)
+        e_val = e_val * lam
+
+    elif method == 'dense':
+        u = len(band) - 1
+        H = np.diag(band[u])
+        for m in range(1, u + 1):
+            H += np.diag(band[u - m, m:], m) + np.diag(band[u - m, m:], -m)
+
+        # eigenvalues, eigenvectors
+        e_val, e_vec = np.linalg.eig(H)
+        e_val.sort()
+        e_val = [i * lam for i in e_val]
+
+        # print(lam)
+        # k = (h_/length)**2 / (2 + m_e)
+        # print(k)
+
+    else:
+        raise ValueError(f'unknown method {method}')
+
+    if grid is not None:
+        e_vec = e_vec / np.sqrt(w)[:, None]
+    return e_val, e_vec
+
 
+def convergence_benchmark(levels=10, Ns=(25, 50, 100, 200, 400), length=2*10**-9):
+    """relative error of the first levels of the infinite well vs the analytic (n pi h_ / L)^2 / 2m, per stencil"""
+    exact = (np.arange(1, levels + 1) * pi * h_ / length) ** 2 / (2 * m_e)
+    errors = {}
 
-    # eigenvalues, eigenvectors
-    e_val, e_vec = np.linalg.eig(H)
-    e_val.sort()
-    e_val = [i * lam for i in e_val]
+    def V(_):
+        return 0
 
-    # print(lam)
-    # k = (h_/length)**2 / (2 + m_e)
-    # print(k)
+    print(f'\n{"N":>6}' + ''.join([f'{f"{s}-point":>14}' for s in STENCILS]))
+    for N in Ns:
+        for s in STENCILS:
+            e_val, _ = solve_H(V, [0, length], N=N, k=levels, method='banded', stencil=s)
+            errors[(N, s)] = np.max(np.abs(e_val - exact) / exact)
+        print(f'{N:>6}' + ''.join([f'{errors[(N, s)]:>14.2e}' for s in STENCILS]))
+    return errors
+
+
+def solve_H_nd(V_, box, N=40, k=10, sigma='auto', tol=10 ** -10):
+    """
+    lowest k energy eigenvalues & eigenvectors of a particle in a 2D / 3D box (Lanczos / ARPACK, scipy eigsh)
+    :param V_: vectorized potential V_(x, y[, z]) (broadcast on an 'ij' grid), None for an empty box
+    :param box: one interval per dimension
+    :param N: inner lattice points per dimension (int or list)
+    :param sigma: 'auto': shift-invert just below the spectrum, (H - sigma)^-1 by conjugate gradient preconditioned
+    with the exact inverse of the kinetic term + min(V_) (discrete sine transforms), matrix-free;
+    a number [same units as V_]: shift-invert around sigma by sparse LU (small grids only);
+    None: plain Lanczos on the matrix-free operator (slow convergence at the bottom of the spectrum)
+    :param tol: relative tolerance of the conjugate gradient solves and of the eigenpairs ('auto')
+    :return: sorted eigenvalues (for calc_wavelengths), eigenvectors (prod(N), k) to reshape to the grid
+    """
+    dim = len(box)
+    N = [N] * dim if type(N) == int else list(N)
+    delta = [(box[i][1] - box[i][0]) / (N[i] + 1) for i in range(dim)]
+    lam = h_**2 / (2 * m_e * delta[0]**2)     # unit of the matrix elements
+
+    coords = np.meshgrid(*[lattice(box[i], N[i]) for i in range(dim)], indexing='ij', sparse=True)
+    v = np.zeros(N) if V_ is None else np.broadcast_to(np.asarray(V_(*coords), dtype=float), N) / lam
+    scale = [(delta[0] / delta[i]) ** 2 for i in range(dim)]
+    n = int(np.prod(N))
+
+    # matrix-free Kronecker sum: memory ~ a few grid-sized arrays
+    def matvec(f):
+        f = f.reshape(N)
+        out = (v + 2 * sum(scale)) * f
+        for i in range(dim):
+            out[(slice(None),) * i + (slice(1, None),)] -= scale[i] * f[(slice(None),) * i + (slice(None, -1),)]
+            out[(slice(None),) * i + (slice(None, -1),)] -= scale[i] * f[(slice(None),) * i + (slice(1, None),)]
+        return out.ravel()
+
+    H = LinearOperator((n, n), matvec=matvec, dtype=float)
+
+    if sigma is None:
+        e_val, e_vec = eigsh(H, k=k, which='SA')
+
+    elif sigma == 'auto':
+        # eigenvalues of the kinetic term, diagonal in the discrete sine basis
+        mu = [scale[i] * (2 - 2 * np.cos(pi * np.arange(1, N[i] + 1) / (N[i] + 1))) for i in range(dim)]
+        kinetic = sum(np.reshape(mu[i], [-1 if j == i else 1 for j in range(dim)]) for i in range(dim))
+        shift = v.min() + kinetic.min() / 2     # H - shift >= kinetic.min() / 2 > 0
+        inverse = 1 / (kinetic + v.min() - shift)
+
+        def precondition(f):
+            return dstn(dstn(f.reshape(N), type=1, norm='ortho') * inverse, type=1, norm='ortho').ravel()
+
+        shifted = LinearOperator((n, n), matvec=lambda f: matvec(f) - shift * f, dtype=float)
+        M = LinearOperator((n, n), matvec=precondition, dtype=float)
+
+        def solve(b):
+            x, info = cg(shifted, b, x0=precondition(b), rtol=tol, M=M)
+            if info:
+                raise RuntimeError(f'conjugate gradient did not converge ({info} iterations)')
+            return x
+
+        OPinv = LinearOperator((n, n), matvec=solve, dtype=float)
+        e_val, e_vec = eigsh(H, k=k, sigma=shift, which='LM', OPinv=OPinv, tol=tol)
+
+        # Lanczos can miss copies of degenerate levels (the cube is very symmetric and the preconditioner exact):
+        # look for them one at a time in the complement of the eigenvectors found so far
+        while True:
+            def deflated(f, X=e_vec):
+                g = solve(f - X @ (X.T @ f))
+                return g - X @ (X.T @ g)
+
+            theta, missed = eigsh(LinearOperator((n, n), matvec=deflated, dtype=float), k=1, which='LA', tol=tol)
+            lower = shift + 1 / theta < e_val.max() - 10 ** -9 * np.abs(e_val).max()
+            if not lower.any():
+                break
+            e_val = np.concatenate([e_val, shift + 1 / theta[lower]])
+            e_vec = np.hstack([e_vec, missed[:, lower]])
+            keep = np.argsort(e_val)[:k]
+            e_val, e_vec = e_val[keep], e_vec[:, keep]
 
+    else:
+        # sparse Kronecker sum of the 1D second differences, shift-invert by sparse LU
+        S = sparse.diags(v.ravel())
+        for i in range(dim):
+            t = sparse.diags([-np.ones(N[i] - 1), 2 * np.ones(N[i]), -np.ones(N[i] - 1)], [-1, 0, 1]) * scale[i]
+            S = S + sparse.kron(sparse.kron(sparse.identity(int(np.prod(N[:i]))), t),
+                                sparse.identity(int(np.prod(N[i + 1:]))))
+        e_val, e_vec = eigsh(S.tocsc(), k=k, sigma=sigma / lam, which='LM')
+
+    order = np.argsort(e_val)
+    return e_val[order] * lam, e_vec[:, order]
+
+
+def test_box_degeneracies(dim=3, N=20, levels=10):
+    """solve_H_nd of an empty cube vs the analytic degeneracies of gen() in "particle in a box.py"""
+    spec = importlib.util.spec_from_file_location('particle_in_a_box',
+                                                  os.path.join(os.path.dirname(__file__), 'particle in a box.py'))
+    box = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(box)
+    expected = [i[2] for i in box.gen(n_max=7, dim=dim)[:levels]]
+
+    e_val, _ = solve_H_nd(None, [[0, 2*10**-9]] * dim, N=N, k=sum(expected) + 1)
+    # group equal eigenvalues (the lattice keeps the symmetry of the box, not the accidental degeneracies)
+    new_level = level_starts(e_val)
+    found = np.diff(np.concatenate([np.flatnonzero(new_level), [len(e_val)]]))
+    assert list(found[:levels]) == expected, (list(found[:levels]), expected)
+
+
+def test_cube_wavelengths():
+    """degenerate levels of the cube give no spurious lines from their rounding differences"""
+    e_val, _ = solve_H_nd(None, [[0, 2*10**-9]] * 3, N=20, k=10)     # levels 1, 3, 3, 3
+    wl = calc_wavelengths(e_val, quiet=True)
+    assert len(wl) == 5 and wl.max() < 10 ** 4, wl
+
+
+def lattice(interval, N):
+    """the N inner points of the lattice used by solve_H"""
+    delta = (interval[1] - interval[0]) / (N + 1)
+    return interval[0] + delta * np.arange(1, N + 1)
+
+
+def spectrum_key(v, interval, N, k=None):
+    """hash of the potential samples v, interval, N, k (name of the cache file)"""
+    key = sha1(np.ascontiguousarray(v, dtype=float).tobytes())
+    key.update(repr((float(interval[0]), float(interval[1]), int(N), k)).encode())
+    return key.hexdigest()
+
+
+def cached_solve_H(v, interval, N, k=None, cache_dir='spectra_cache'):
+    """solve_H (tridiagonal) for the potential samples v, eigenvalues & eigenvectors are cached in cache_dir"""
+    path = os.path.join(cache_dir, spectrum_key(v, interval, N, k) + '.npz')
+    if os.path.exists(path):
+        with np.load(path) as f:
+            return f['e_val'], f['e_vec']
+
+    e_val, e_vec = solve_H(v, interval, N=N, k=k, method='tridiagonal')
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez(path, e_val=e_val, e_vec=e_vec)
     return e_val, e_vec
 
 
+def sweep(potential, params, interval, N=50, k=10, cache_dir='spectra_cache', workers=None):
+    """
+    spectra of potential(**p) for every parameter point p, solved in a process pool and cached on disk
+    :param potential: factory of vectorized potentials (e.g. square_well)
+    :param params: {name: values} (all the combinations are computed) or list of {name: value};
+    "N" can be a parameter too
+    :param k: number of levels per point
+    :return: structured array with the parameters, 'levels' (k) and 'wavelengths' (k (k-1) / 2, NaN-padded)
+    """
+    if type(params) == dict:
+        points = [dict(zip(params, values)) for values in product(*params.values())]
+    else:
+        points = list(params)
+    names = list(points[0]) if points else []
+    n_lines = k * (k - 1) // 2
+    dtype = [(i, float) for i in names if i != 'N'] + [('N', int), ('levels', float, (k,)), ('wavelengths', float, (n_lines,))]
+    if not points:
+        return np.zeros(0, dtype=dtype)
+
+    # the potential is sampled here: the samples are the cache key and can be sent to the workers
+    jobs = []
+    for p in points:
+        n = int(p.get('N', N))
+        kw = {i: p[i] for i in p if i != 'N'}
+        jobs.append((sample_potential(potential(**kw), lattice(interval, n)), interval, n, k, cache_dir))
+
+    with ProcessPoolExecutor(workers) as pool:
+        solutions = list(pool.map(cached_solve_H, *zip(*jobs)))
+
+    out = np.zeros(len(points), dtype=dtype)
+    for i, (p, job, (e_val, _)) in enumerate(zip(points, jobs, solutions)):
+        for name in p:
+            out[i][name] = p[name]
+        out[i]['N'] = job[2]
+        out[i]['levels'] = np.nan
+        out[i]['levels'][:len(e_val)] = e_val[:k]
+        wl = calc_wavelengths(e_val[:k], quiet=True)
+        out[i]['wavelengths'] = np.nan
+        out[i]['wavelengths'][:len(wl)] = wl
+    return out
+
+
 def wavelength_of_energy(E):
     return h * c / E
 
@@ -70,22 +373,56 @@ def plot_eigen_states(v, first_n=3, **kwargs):
         plt.show()
 
 
-def calc_wavelengths(eigen_val):
-    wavelengths = []
-    for i in eigen_val:
-        for j in eigen_val:
-            nrg = abs(i - j)
-            if nrg > 0:
-                wl = wavelength_of_energy(nrg) * 10 ** 9
-                wl = round(wl, 5)
-                wavelengths.append(wl)
+def unique_sorted(v, tol):
+    """drop the values of the sorted array v closer than tol to the previous one"""
+    if len(v) == 0:
+        return v
+    return v[np.concatenate([[True], np.diff(v) > tol])]
+
+
+def parity_rule(i, j):
+    """dipole selection rule for symmetric potentials: the parity of the level must change"""
+    return (j - i) % 2 == 1
+
+
+def level_starts(e, rtol=10 ** -6):
+    """True where the sorted eigenvalues e start a new level (copies of a degenerate level differ by rounding only)"""
+    return np.concatenate([[True], np.diff(e) > rtol * np.abs(e[1:])])
 
-    wavelengths = list(set(wavelengths))    # remove duplicates
-    wavelengths.sort()
 
-    print('\nWavelengths [nm]\n')
-    for i in wavelengths:
-        print(f'{i:.1f}')
+def calc_wavelengths(eigen_val, selection=None, tol=10 ** -5, chunk=2 ** 22, quiet=False, rtol=10 ** -6):
+    """
+    wavelengths [nm] of the transitions between the levels eigen_val
+    :param selection: selection rule, function of the level indices (i, j) with i < j -> bool array (e.g. parity_rule)
+    :param tol: lines closer than tol [nm] count as one
+    :param rtol: eigenvalues closer than rtol (relative) are one degenerate level (see level_starts)
+    :param chunk: max number of level pairs held in memory at once
+    :param quiet: return the wavelengths without printing them
+    """
+    e = np.sort(np.asarray(eigen_val, dtype=float))
+    if len(e):
+        e = e[level_starts(e, rtol)]
+    n = len(e)
+    rows = max(1, chunk // max(n, 1))
+
+    wavelengths = []
+    for start in range(0, n, rows):
+        # upper-triangular differences of a block of rows
+        i = np.arange(start, min(start + rows, n))[:, None]
+        j = np.arange(n)[None, :]
+        mask = j > i
+        if selection is not None:
+            mask &= selection(i, j)
+        nrg = (e[None, :] - e[i])[mask]
+        wl = wavelength_of_energy(nrg[nrg > 0]) * 10 ** 9
+        wavelengths.append(unique_sorted(np.sort(wl), tol))
+
+    wavelengths = unique_sorted(np.sort(np.concatenate(wavelengths)), tol) if n else np.array([])
+
+    if not quiet:
+        print('\nWavelengths [nm]\n')
+        for i in wavelengths:
+            print(f'{i:.1f}')
 
     return wavelengths
 
@@ -94,7 +431,7 @@ def plot_wavelengths(wl, x_max=None, linewidth=1., **kwargs):
     plt.axes().set_facecolor("black")
     plt.title('Emission spectrum [nm]')
     plt.yticks([])
-    plt.vlines(wl, 0, 1, colors=[color_of_wavelength(i) for i in wl], linewidth=linewidth, **kwargs)
+    plt.vlines(wl, 0, 1, colors=colors_of_wavelengths(wl), linewidth=linewidth, **kwargs)
     if x_max:
         plt.xlim(0, x_max)
     else:
@@ -103,6 +440,50 @@ def plot_wavelengths(wl, x_max=None, linewidth=1., **kwargs):
     plt.show()
 
 
+def line_profile(x, broadening, fwhm):
+    """peak-normalized line shape at distances x"""
+    if broadening == 'gaussian':
+        return np.exp(-4 * np.log(2) * (x / fwhm) ** 2)
+    elif broadening == 'lorentzian':
+        return 1 / (1 + (2 * x / fwhm) ** 2)
+    raise ValueError(f'unknown broadening {broadening}')
+
+
+def spectrum_image(wl, path=None, intensity=None, x_max=None, width=2048, height=128, broadening=None, fwhm=1.):
+    """
+    headless version of plot_wavelengths: the lines are binned into an image buffer (no matplotlib artists)
+    :param wl: wavelengths [nm]
+    :param path: write the image there as PNG
+    :param intensity: weight of each line (default 1)
+    :param x_max: the image covers [0, x_max] nm
+    :param width: pixels along the wavelength axis
+    :param broadening: None, 'gaussian' or 'lorentzian' (FFT convolution)
+    :param fwhm: full width at half maximum of the broadening [nm]
+    :return: (height, width, 3) float array
+    """
+    wl = np.asarray(wl, dtype=float)
+    if x_max is None:
+        x_max = wl.max() * 1.05 if len(wl) else 1.
+    lines, edges = np.histogram(wl, bins=width, range=(0, x_max), weights=intensity)
+
+    if broadening is not None:
+        dx = x_max / width
+        offsets = np.arange(-width + 1, width) * dx
+        kernel = line_profile(offsets, broadening, fwhm)
+        n = 3 * width - 1   # zero padding, no wrap-around
+        lines = np.fft.irfft(np.fft.rfft(lines, n) * np.fft.rfft(kernel, n), n)[width - 1:2 * width - 1]
+
+    if lines.max() > 0:
+        lines = lines / lines.max()
+    rgba = colors_of_wavelengths((edges[:-1] + edges[1:]) / 2)
+    row = np.clip(rgba[:, :3] * rgba[:, 3:] * lines[:, None], 0, 1)
+    image = np.broadcast_to(row, (height, width, 3))
+
+    if path is not None:
+        imsave(path, image)
+    return image
+
+
 def color_of_wavelength(wl, gamma=0.8):
     red = 750
     violet = 380
@@ -149,6 +530,61 @@ def color_of_wavelength(wl, gamma=0.8):
     return R, G, B, A
 
 
+color_tables = {}   # (gamma, step) -> wavelengths, RGB of color_of_wavelength
+
+
+def colors_of_wavelengths(wl, gamma=0.8, step=.1):
+    """
+    vectorized color_of_wavelength: RGBA array of shape (len(wl), 4)
+    RGB are interpolated from a lookup table of color_of_wavelength sampled every step nm
+    """
+    violet, red = 380, 750
+    if (gamma, step) not in color_tables:
+        x = np.linspace(violet, red, int(round((red - violet) / step)) + 1)
+        color_tables[(gamma, step)] = x, np.array([color_of_wavelength(i, gamma)[:3] for i in x])
+    x, rgb = color_tables[(gamma, step)]
+
+    wl = np.asarray(wl, dtype=float)
+    out = np.empty(wl.shape + (4,))
+    for i in range(3):
+        out[..., i] = np.interp(wl, x, rgb[:, i])   # constant outside [violet, red], like color_of_wavelength
+    out[..., 3] = np.where(wl <= violet, wl / violet / 2, np.where(wl >= red, 2/3, 1.))
+    return out
+
+
+# --- vectorized potentials ----------------------------------------------------------------
+
+
+def square_well(depth, width, center=0.):
+    """depth inside |x - center| < width / 2, 0 outside"""
+    def V(x):
+        return np.where(np.abs(x - center) < width / 2, depth, 0.)
+    return V
+
+
+def harmonic(k, center=0.):
+    """k (x - center)^2 / 2"""
+    def V(x):
+        return k * (x - center) ** 2 / 2
+    return V
+
+
+def double_well(height, separation, center=0.):
+    """minima (V = 0) at center +- separation / 2, barrier of the given height at center"""
+    def V(x):
+        return height * ((2 * (x - center) / separation) ** 2 - 1) ** 2
+    return V
+
+
+def piecewise_linear(xp, fp):
+    """linear interpolation of the points (xp, fp), constant outside"""
+    xp, fp = np.asarray(xp, dtype=float), np.asarray(fp, dtype=float)
+
+    def V(x):
+        return np.interp(x, xp, fp)
+    return V
+
+
 # ----------------------------------------------------------------
 
 def infinite_well(length=2*10**-9):
@@ -156,7 +592,7 @@ def infinite_well(length=2*10**-9):
     def V(_):
         return 0
 
-    eig_val, eig_vec = solve_H(V, [0, length], N=50)
+    eig_val, eig_vec = solve_H(V, [0, length], N=50, method='tridiagonal')
     wl = calc_wavelengths(eig_val)
     # plot_eigen_vals(eig_val)
     # plot_eigen_states(eig_vec)
@@ -166,14 +602,19 @@ def infinite_well(length=2*10**-9):
 
 def finite_well(length=2*10**-9):
 
-    def V(x):
-        return -.1 if abs(x) < length / 4 else 0
+    V = square_well(-.1, length / 2)
 
-    eig_val, eig_vec = solve_H(V, [-length, +length], N=50)
+    eig_val, eig_vec = solve_H(V, [-length, +length], N=50, method='tridiagonal')
     wave_len = calc_wavelengths(eig_val)
     plot_wavelengths(wave_len)
 
 
+def cubic_box(length=2*10**-9, N=40, k=30):
+    """emission spectrum of the lowest k states of a cubic box, on a 3D lattice"""
+    eig_val, eig_vec = solve_H_nd(None, [[0, length]] * 3, N=N, k=k)
+    wl = calc_wavelengths(eig_val)
+    plot_wavelengths(wl)
+
 
 if __name__ == '__main__':
     finite_well()